@@ -0,0 +1,11 @@
+"""
+Optional Numba import. Without numba installed, njit becomes a no-op decorator
+so the kernels still run as plain (much slower) Python.
+"""
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:  # Bare @njit
+            return args[0]
+        return lambda func: func
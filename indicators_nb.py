@@ -0,0 +1,164 @@
+"""
+Numba-compiled technical indicator kernels.
+
+Each kernel makes a single pass over float64 NumPy arrays, carrying running
+state (window sums, EWMA values) instead of recomputing every window, and
+returns the same values as the equivalent `ta` function. The kernels release
+the GIL so the app's per-ticker worker threads can run them in parallel.
+"""
+import numpy as np
+from _njit import njit
+
+# Every fastmath flag except nnan/ninf: the kernels emit and test for NaN warm-up values.
+FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def sma(close, window):
+    """
+    Simple moving average. A running sum adds the newest value and subtracts the
+    one leaving the window. Positions without a full window of values are NaN.
+    """
+    n = close.size
+    out = np.full(n, np.nan)
+    count = 0
+    total = 0.0
+    for i in range(n):
+        x = close[i]
+        if np.isnan(x):  # A gap restarts the window, as pandas rolling does
+            count = 0
+            total = 0.0
+            continue
+        if count < window:
+            count += 1
+            total += x
+        else:
+            total += x - close[i - window]
+        if count == window:
+            out[i] = total / window
+    return out
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def ewm_mean(values, alpha, min_periods):
+    """
+    Exponentially weighted mean matching pandas' ewm(alpha=..., adjust=False).mean().
+    """
+    n = values.size
+    out = np.full(n, np.nan)
+    decay = 1.0 - alpha
+    count = 0
+    weighted = 0.0
+    old_weight = 1.0
+    for i in range(n):
+        x = values[i]
+        if np.isnan(x):
+            if count > 0:
+                old_weight *= decay
+        else:
+            if count > 0:
+                old_weight *= decay
+                weighted = (old_weight * weighted + alpha * x) / (old_weight + alpha)
+            else:
+                weighted = x
+            count += 1
+            old_weight = 1.0
+        if count >= min_periods:
+            out[i] = weighted
+    return out
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def rsi(close, window=14):
+    """
+    Relative Strength Index using Wilder smoothing of running gain and loss averages.
+    """
+    n = close.size
+    out = np.full(n, np.nan)
+    alpha = 1.0 / window
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(n):
+        gain = 0.0
+        loss = 0.0
+        if i > 0:
+            diff = close[i] - close[i - 1]
+            if diff > 0:
+                gain = diff
+            elif diff < 0:
+                loss = -diff
+            avg_gain = (1.0 - alpha) * avg_gain + alpha * gain
+            avg_loss = (1.0 - alpha) * avg_loss + alpha * loss
+        if i >= window - 1:
+            out[i] = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def macd(close, window_slow=26, window_fast=12, window_sign=9):
+    """
+    MACD line and signal line. Returns (macd, signal).
+    """
+    ema_fast = ewm_mean(close, 2.0 / (window_fast + 1), window_fast)
+    ema_slow = ewm_mean(close, 2.0 / (window_slow + 1), window_slow)
+    macd_line = ema_fast - ema_slow
+    signal = ewm_mean(macd_line, 2.0 / (window_sign + 1), window_sign)
+    return macd_line, signal
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def bollinger_bands(close, window=20, window_dev=2):
+    """
+    Bollinger Bands from a sliding-window Welford update of the mean and variance,
+    O(1) per step. Returns (upper, lower).
+    """
+    n = close.size
+    upper = np.full(n, np.nan)
+    lower = np.full(n, np.nan)
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        x = close[i]
+        if np.isnan(x):
+            count = 0
+            mean = 0.0
+            m2 = 0.0
+            continue
+        if count < window:
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        else:
+            old = close[i - window]
+            new_mean = mean + (x - old) / window
+            m2 += (x - old) * (x - new_mean + old - mean)
+            mean = new_mean
+        if count == window:
+            std = np.sqrt(max(m2 / window, 0.0))
+            upper[i] = mean + window_dev * std
+            lower[i] = mean - window_dev * std
+    return upper, lower
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def average_true_range(high, low, close, window=14):
+    """
+    Average True Range with Wilder smoothing. Like `ta`, the first window - 1
+    values are 0 and the first average is the plain mean of the true range.
+    """
+    n = close.size
+    out = np.zeros(n)
+    if n < window:
+        return out
+    true_range = np.empty(n)
+    for i in range(n):
+        tr = high[i] - low[i]
+        if i > 0 and not np.isnan(close[i - 1]):
+            tr = max(tr, abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        true_range[i] = tr
+    out[window - 1] = true_range[:window].mean()
+    for i in range(window, n):
+        out[i] = (out[i - 1] * (window - 1) + true_range[i]) / window
+    return out
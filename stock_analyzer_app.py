@@ -1,12 +1,249 @@
 import yfinance as yf
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import io
-from ta.trend import sma_indicator, macd, macd_signal
-from ta.volatility import bollinger_hband, bollinger_lband
-from ta.momentum import rsi
-from ta.volatility import average_true_range
+import os
+import gzip
+import pickle
+import time
+import tempfile
+from datetime import date
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from indicators_nb import sma, rsi, macd, bollinger_bands, average_true_range
+
+try:
+    import redis
+except ImportError:  # Redis is optional; without it only Streamlit's in-process cache is used
+    redis = None
+
+CACHE_TTL = 3600  # Seconds before cached Yahoo Finance data is refetched
+LOCK_TIMEOUT = 30  # Seconds a fetch lock is held before it expires
+# Downloaded histories are also kept here as Parquet files so they survive app restarts
+HISTORY_CACHE_DIR = Path(os.environ.get("STOCK_ANALYZER_CACHE_DIR", Path.home() / ".cache" / "stock_analyzer"))
+
+PLOT_DPI = 80
+
+# Explanations shown under each chart
+PRICE_CHART_NOTE = "Bollinger Bands: Measure volatility. Prices near upper band may be overbought, near lower band may be oversold."
+RSI_CHART_NOTE = "RSI: Measures the speed and change of price movements. Values above 70 indicate overbought conditions, below 30 indicate oversold."
+MACD_CHART_NOTE = "MACD: Shows changes in strength, direction, momentum, and duration of a trend. A bullish crossover occurs when MACD crosses above the signal line."
+
+# Columns of the consolidated table, in display order
+TABLE_COLUMNS = [
+    'Company', 'Sector', 'Score', 'Trade Signal', 'Current Price', 'PE Ratio', 'Dividend Yield',
+    'Close', 'SMA_20', 'SMA_50', 'RSI', 'MACD', 'MACD_signal', 'BB_upper', 'BB_lower', 'ATR',
+    # 'SMA_20_above_SMA_50_Explanation', 'RSI_below_70_Explanation', 'MACD_above_signal_Explanation',
+    # 'Close_above_BB_lower_Explanation', 'RSI_above_70_Explanation', 'MACD_below_signal_Explanation',
+    # "High Volatility Don't Buy", "High Volatility Sell",
+]
+# Numeric columns of the consolidated table, displayed and exported with 2 decimal places
+NUMERIC_COLUMNS = [
+    'Score', 'Current Price', 'PE Ratio', 'Dividend Yield', 'Close', 'SMA_20', 'SMA_50',
+    'RSI', 'MACD', 'MACD_signal', 'BB_upper', 'BB_lower', 'ATR',
+]
+TRADE_SIGNALS = ["Buy", "Hold", "Don't Buy", "Sell"]
+
+# Indicator windows in bars. The weekly windows span roughly the same time as the daily ones.
+DAILY_WINDOWS = {'sma_short': 20, 'sma_long': 50, 'rsi': 14, 'bollinger': 20, 'atr': 14}
+WEEKLY_WINDOWS = {'sma_short': 4, 'sma_long': 10, 'rsi': 3, 'bollinger': 4, 'atr': 3}
+
+# Scoring conditions in the order used by the weight vectors below
+CONDITION_NAMES = (
+    'SMA_20_above_SMA_50',
+    'RSI_below_70',
+    'MACD_above_signal',
+    'Close_above_BB_lower',
+    'RSI_above_70',  # Sell Indicator
+    'MACD_below_signal',  # Sell Indicator
+)
+W_NORMAL = np.array([0.3, 0.25, 0.3, 0.15, -0.2, -0.2])
+# High volatility increases the RSI and sell weights and decreases the Bollinger weight
+W_HIGHVOL = W_NORMAL * np.array([1.0, 1.2, 1.0, 0.8, 1.2, 1.2])
+W_NORMAL.flags.writeable = False
+W_HIGHVOL.flags.writeable = False
+
+# (buy, sell) score thresholds. High volatility raises the buy and lowers the sell threshold.
+TH_NORMAL = (0.7, 0.3)
+TH_HIGHVOL = (0.7 * 1.1, 0.3 * 0.9)
+
+
+@st.cache_resource
+def get_redis_client():
+    """
+    Returns a Redis client when REDIS_URL is set and redis is installed, otherwise None.
+    """
+    redis_url = os.environ.get("REDIS_URL")
+    if redis is None or not redis_url:
+        return None
+    return redis.Redis.from_url(redis_url)
+
+
+def cache_get(key):
+    """
+    Reads a gzip-pickled value from Redis. Returns None on a miss or when Redis is unavailable.
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        payload = client.get(key)
+    except Exception as e:
+        print(f"Error reading {key} from Redis: {e}")
+        return None
+    return pickle.loads(gzip.decompress(payload)) if payload else None
+
+
+def cache_set(key, value, ttl=CACHE_TTL):
+    """
+    Stores a value in Redis as a gzip-pickled payload that expires after ttl seconds.
+    """
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.setex(key, ttl, gzip.compress(pickle.dumps(value)))
+    except Exception as e:
+        print(f"Error writing {key} to Redis: {e}")
+
+
+def acquire_fetch_lock(key):
+    """
+    Claims the right to fetch key from Yahoo with a SETNX lock so concurrent sessions
+    don't all fetch the same data on a cache miss. Returns True when the caller should fetch.
+    """
+    client = get_redis_client()
+    if client is None:
+        return True
+    try:
+        return bool(client.set(f"lock:{key}", 1, nx=True, ex=LOCK_TIMEOUT))
+    except Exception:
+        return True
+
+
+def release_fetch_lock(key):
+    """
+    Releases a fetch lock once its data is cached, or once the fetch has failed, so
+    waiting sessions can stop polling and fetch for themselves.
+    """
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.delete(f"lock:{key}")
+    except Exception:
+        pass
+
+
+def fetch_lock_held(key):
+    """
+    Returns True while another session holds the fetch lock for key.
+    """
+    client = get_redis_client()
+    if client is None:
+        return False
+    try:
+        return bool(client.exists(f"lock:{key}"))
+    except Exception:
+        return False
+
+
+def wait_for_cache(keys, timeout=10, interval=0.5):
+    """
+    Polls Redis for values other sessions are fetching, waiting at most timeout seconds
+    in total for all of them. A key whose lock is released without a value (the other
+    session's fetch failed) stops being waited for. Returns a dict of the keys whose
+    values arrived in time.
+    """
+    found = {}
+    pending = list(keys)
+    deadline = time.monotonic() + timeout
+    while pending:
+        still_pending = []
+        for key in pending:
+            value = cache_get(key)
+            if value is None and not fetch_lock_held(key):
+                value = cache_get(key)  # The value may have been stored just before the lock was released
+                if value is None:
+                    continue
+            if value is not None:
+                found[key] = value
+            else:
+                still_pending.append(key)
+        pending = still_pending
+        if not pending or time.monotonic() >= deadline:
+            break
+        time.sleep(interval)
+    return found
+
+
+def attach_script_run_ctx(ctx):
+    """
+    ThreadPoolExecutor initializer that gives a worker thread the script's
+    ScriptRunContext, so the cached functions it calls don't warn about a missing one.
+    """
+    if ctx is not None:
+        add_script_run_ctx(ctx=ctx)
+
+
+def history_key(ticker, period):
+    return f"hist:{ticker}:{period}:{date.today()}"
+
+
+def info_key(ticker):
+    return f"info:{ticker}:{date.today()}"
+
+
+def history_path(ticker, period):
+    return HISTORY_CACHE_DIR / f"{ticker}_{period}_{date.today():%Y%m%d}.parquet"
+
+
+def read_history_file(ticker, period):
+    """
+    Reads today's Parquet copy of a ticker's history. Returns None if there isn't one
+    or it was written more than CACHE_TTL seconds ago, so today's bar gets refreshed.
+    """
+    path = history_path(ticker, period)
+    try:
+        if time.time() - path.stat().st_mtime > CACHE_TTL:
+            return None
+        history = pd.read_parquet(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return None
+    return history if not history.empty else None
+
+
+def store_history(ticker, period, history):
+    """
+    Saves a downloaded history to Redis and to today's Parquet file, removing the
+    ticker's files from earlier days. The file is written to a temporary name and
+    then moved into place so other sessions never read a partial file. Empty histories
+    (failed downloads) are not saved, so the ticker is fetched again next time.
+    """
+    if history.empty:
+        return
+    cache_set(history_key(ticker, period), history)
+    path = history_path(ticker, period)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for old_path in path.parent.glob(f"{ticker}_{period}_*.parquet"):
+            if old_path != path:
+                old_path.unlink(missing_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        os.close(fd)
+        try:
+            history.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)  # Don't leave the partial file behind
+            raise
+    except Exception as e:
+        print(f"Error writing {path}: {e}")
 
 
 def get_news_links(ticker):
@@ -25,173 +262,399 @@ def get_news_links(ticker):
         return []
 
 
-def analyze_stocks_complex_with_scoring_consolidated(tickers, period="1y"):
+def download_histories(tickers, period="1y", batch_size=20):
+    """
+    Downloads price history for several tickers with batched yf.download calls.
+    Tickers are requested in groups of batch_size to stay under Yahoo's URL limit,
+    and histories already saved on disk or in Redis within CACHE_TTL are not requested
+    at all. Not memoized with st.cache_data: only non-empty histories reach those
+    caches, so a ticker that failed to download is requested again on the next run.
+    Returns a dict mapping each ticker to its OHLCV DataFrame.
+    """
+    histories = {}
+    for ticker in tickers:
+        cached = read_history_file(ticker, period)
+        if cached is None:
+            cached = cache_get(history_key(ticker, period))
+        if cached is not None:
+            histories[ticker] = cached
+
+    def fetch(symbols):
+        for start in range(0, len(symbols), batch_size):
+            batch = symbols[start:start + batch_size]
+            try:
+                # Splits/dividends aren't needed for the indicators; prices stay split-adjusted like Ticker.history
+                data = yf.download(
+                    batch, period=period, interval='1d', group_by='ticker', actions=False,
+                    auto_adjust=True, rounding=False, threads=True, progress=False,
+                )
+                if data.empty:
+                    continue
+                if not isinstance(data.columns, pd.MultiIndex):  # Older yfinance returns flat columns for one ticker
+                    histories[batch[0]] = data
+                    store_history(batch[0], period, histories[batch[0]])
+                    continue
+                downloaded = data.columns.get_level_values(0)
+                for ticker in batch:
+                    if ticker in downloaded:
+                        histories[ticker] = data.xs(ticker, axis=1, level=0).dropna(how='all')
+                        store_history(ticker, period, histories[ticker])
+            finally:
+                for ticker in batch:
+                    if ticker in acquired:  # Locks held by other sessions are left to them
+                        release_fetch_lock(history_key(ticker, period))
+
+    acquired = set()
+    locked = []
+    for ticker in tickers:
+        if ticker in histories:
+            continue
+        if acquire_fetch_lock(history_key(ticker, period)):
+            acquired.add(ticker)
+        else:
+            locked.append(ticker)
+    fetch([ticker for ticker in tickers if ticker in acquired])
+
+    # Tickers another session is downloading are waited for together, then fetched here if they don't arrive
+    if locked:
+        arrived = wait_for_cache([history_key(ticker, period) for ticker in locked])
+        for ticker in locked:
+            if history_key(ticker, period) in arrived:
+                histories[ticker] = arrived[history_key(ticker, period)]
+            elif acquire_fetch_lock(history_key(ticker, period)):
+                acquired.add(ticker)
+        fetch([ticker for ticker in locked if ticker not in histories])
+    return histories
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def fetch_info(ticker):
+    """
+    Fetches one ticker's yfinance info dict, reading through the Redis cache. Cached
+    per ticker; a failed lookup raises, so Streamlit doesn't cache it and it is retried
+    on the next run.
+    """
+    key = info_key(ticker)
+    info = cache_get(key)
+    if info is not None:
+        return info
+    acquired = acquire_fetch_lock(key)
+    if not acquired:
+        info = wait_for_cache([key]).get(key)
+        if info is not None:
+            return info
+        acquired = acquire_fetch_lock(key)
+    try:
+        info = yf.Ticker(ticker).info
+        cache_set(key, info)
+        return info
+    finally:
+        if acquired:
+            release_fetch_lock(key)
+
+
+def fetch_infos(tickers, max_workers=8):
+    """
+    Fetches the info dicts for several tickers concurrently. A ticker whose lookup
+    fails maps to an empty dict.
+    """
+    def fetch_or_empty(ticker):
+        try:
+            return fetch_info(ticker)
+        except Exception as e:
+            print(f"Error fetching info for {ticker}: {e}")
+            return {}
+
+    if not tickers:
+        return {}
+    with ThreadPoolExecutor(
+        max_workers=max_workers, initializer=attach_script_run_ctx,
+        initargs=(get_script_run_ctx(suppress_warning=True),),
+    ) as executor:
+        return dict(zip(tickers, executor.map(fetch_or_empty, tickers)))
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def compute_indicators(ticker, period, as_of, _history, weekly=False):
+    """
+    Computes the technical indicators for one ticker's history once and caches them.
+    The cache is keyed on ticker, period, as_of (pass date.today() so it
+    invalidates daily) and weekly; _history is not hashed. With weekly=True the
+    daily bars are first aggregated into weekly bars and WEEKLY_WINDOWS are used.
+    Returns the last value of each indicator for scoring, the ATR mean, and the
+    full history for plotting.
+    """
+    history = _history.copy()
+    windows = DAILY_WINDOWS
+    if weekly:
+        history = history.resample('W').agg(
+            {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+        ).dropna()
+        windows = WEEKLY_WINDOWS
+    close = history['Close'].to_numpy(dtype=np.float64)
+    high = history['High'].to_numpy(dtype=np.float64)
+    low = history['Low'].to_numpy(dtype=np.float64)
+    sma_short = sma(close, windows['sma_short'])
+    sma_long = sma(close, windows['sma_long'])
+    rsi_values = rsi(close, windows['rsi'])
+    macd_line, macd_signal = macd(close)
+    bb_upper, bb_lower = bollinger_bands(close, windows['bollinger'])
+    atr = average_true_range(high, low, close, windows['atr'])
+    indicator_columns = {
+        'SMA_20': sma_short,
+        'SMA_50': sma_long,
+        'RSI': rsi_values,
+        'MACD': macd_line,
+        'MACD_signal': macd_signal,
+        'BB_upper': bb_upper,
+        'BB_lower': bb_lower,
+        'ATR': atr,
+    }
+    for column, values in indicator_columns.items():
+        history[column] = values.astype(np.float32)  # Only plotted; scoring uses the float64 arrays
+
+    # Read the last values straight from the kernel outputs rather than through pandas indexers
+    return {
+        'last_close': float(close[-1]),
+        'sma20_last': float(sma_short[-1]),
+        'sma50_last': float(sma_long[-1]),
+        'rsi_last': float(rsi_values[-1]),
+        'macd_last': float(macd_line[-1]),
+        'macd_signal_last': float(macd_signal[-1]),
+        'bb_upper_last': float(bb_upper[-1]),
+        'bb_lower_last': float(bb_lower[-1]),
+        'atr_last': float(atr[-1]),
+        'atr_mean': float(atr.mean()),
+        'history': history,
+    }
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def render_plot(ticker, period, as_of, weekly, long_name, _history):
+    """
+    Builds the price, RSI and MACD figure for one ticker and returns it as PNG bytes
+    for the plot download. Plots are rendered only when exported, one at a time, and
+    cached on ticker, period, as_of and weekly; _history (with indicator columns) is not hashed.
+    """
+    # Imported here: matplotlib is only needed for the PNG export, not on every script run
+    from matplotlib.figure import Figure
+
+    history = _history
+    fig = Figure(figsize=(16, 12))  # Not pyplot, so the figure is freed as soon as it goes out of scope
+    axes = fig.subplots(3, 1)
+
+    axes[0].plot(history['Close'], label='Close Price')
+    windows, unit = (WEEKLY_WINDOWS, 'week') if weekly else (DAILY_WINDOWS, 'day')
+    axes[0].plot(history['SMA_20'], label=f"{windows['sma_short']}-{unit} SMA")
+    axes[0].plot(history['SMA_50'], label=f"{windows['sma_long']}-{unit} SMA")
+    axes[0].plot(history['BB_upper'], label='Bollinger Upper Band')
+    axes[0].plot(history['BB_lower'], label='Bollinger Lower Band')
+    axes[0].set_title(
+        f"{long_name} ({ticker}): Price, Moving Averages, and Bollinger Bands\n{PRICE_CHART_NOTE}"
+    )
+    axes[0].set_ylabel('Price')
+    axes[0].set_xlabel('Date')
+    axes[0].legend()
+
+    axes[1].plot(history['RSI'], label='RSI')
+    axes[1].set_title(
+        f"{long_name} ({ticker}): Relative Strength Index (RSI)\n{RSI_CHART_NOTE}"
+    )
+    axes[1].axhline(70, color='red', linestyle='--', label='Overbought (70)')
+    axes[1].axhline(30, color='green', linestyle='--', label='Oversold (30)')
+    axes[1].set_ylabel('RSI')
+    axes[1].set_xlabel('Date')
+    axes[1].legend()
+
+    axes[2].plot(history['MACD'], label='MACD')
+    axes[2].plot(history['MACD_signal'], label='MACD Signal')
+    axes[2].set_title(
+        f"{long_name} ({ticker}): Moving Average Convergence Divergence (MACD)\n{MACD_CHART_NOTE}"
+    )
+    axes[2].set_ylabel('MACD')
+    axes[2].set_xlabel('Date')
+    axes[2].legend()
+
+    fig.tight_layout()
+    buf = io.BytesIO()
+    # 80 dpi and zlib level 1 encode several times faster than the defaults for a slightly larger file
+    fig.savefig(buf, format='png', dpi=PLOT_DPI, pil_kwargs={'compress_level': 1})
+    return buf.getvalue()
+
+
+def show_charts(ticker, weekly, long_name, history):
+    """
+    Displays the price, RSI and MACD charts for one ticker with Streamlit's line charts,
+    which are drawn in the browser instead of being rasterized by matplotlib.
+    """
+    windows, unit = (WEEKLY_WINDOWS, 'week') if weekly else (DAILY_WINDOWS, 'day')
+    st.subheader(f"{long_name} ({ticker})")
+
+    st.markdown("**Price, Moving Averages, and Bollinger Bands**")
+    st.line_chart(history[['Close', 'SMA_20', 'SMA_50', 'BB_upper', 'BB_lower']].rename(columns={
+        'Close': 'Close Price',
+        'SMA_20': f"{windows['sma_short']}-{unit} SMA",
+        'SMA_50': f"{windows['sma_long']}-{unit} SMA",
+        'BB_upper': 'Bollinger Upper Band',
+        'BB_lower': 'Bollinger Lower Band',
+    }))
+    st.caption(PRICE_CHART_NOTE)
+
+    st.markdown("**Relative Strength Index (RSI)**")
+    st.line_chart(history[['RSI']].assign(**{'Overbought (70)': 70.0, 'Oversold (30)': 30.0}))
+    st.caption(RSI_CHART_NOTE)
+
+    st.markdown("**Moving Average Convergence Divergence (MACD)**")
+    st.line_chart(history[['MACD', 'MACD_signal']].rename(columns={'MACD_signal': 'MACD Signal'}))
+    st.caption(MACD_CHART_NOTE)
+
+
+def _analyze_one(ticker, period, history, info, weekly=False):
+    """
+    Scores a single ticker. This runs in a worker thread, so rather than calling
+    Streamlit directly it returns (data_table, plot_inputs, messages), where
+    plot_inputs are the arguments for render_plot after the ticker and messages
+    is a list of (level, text) pairs for the caller to display. data_table and
+    plot_inputs are None when the ticker could not be analyzed.
+    """
+    messages = []
+    try:
+        if history.empty:
+            messages.append(('warning', f"No historical data found for {ticker}."))
+            return None, None, messages
+
+        current_price = info.get('currentPrice')
+        long_name = info.get('longName', ticker)
+        sector = info.get('sector')
+        pe_ratio = info.get('trailingPE')
+        dividend_yield = info.get('dividendYield')
+        indicators = compute_indicators(ticker, period, date.today(), history, weekly)
+        history = indicators['history']
+
+        atr_threshold = indicators['atr_mean'] * 1.5
+        high_volatility = indicators['atr_last'] > atr_threshold
+
+        weights = W_HIGHVOL if high_volatility else W_NORMAL
+        buy_threshold, sell_threshold = TH_HIGHVOL if high_volatility else TH_NORMAL
+
+        conditions = np.array([
+            indicators['sma20_last'] > indicators['sma50_last'],
+            indicators['rsi_last'] < 70,
+            indicators['macd_last'] > indicators['macd_signal_last'],
+            indicators['last_close'] > indicators['bb_lower_last'],
+            indicators['rsi_last'] > 70,  # Sell condition
+            indicators['macd_last'] < indicators['macd_signal_last'],  # Sell Condition
+        ], dtype=bool)
+        condition_explanations = {
+            name: "Met" if met else "Not Met" for name, met in zip(CONDITION_NAMES, conditions)
+        }
+
+        score = float(conditions @ weights)
+
+        if score >= buy_threshold:
+            signal = "Buy"
+        elif score <= sell_threshold:
+            signal = "Sell"
+        elif 0.6 <= score < buy_threshold:  # original was elif 0.6 <= score < buy_threshold:
+            signal = "Hold"
+        else:
+            signal = "Don't Buy"  # changed from original signal = "Don't Buy"
+
+        values = [  # In TABLE_COLUMNS order
+            long_name,
+            sector,
+            score,
+            signal,
+            current_price,
+            pe_ratio,
+            dividend_yield,
+            indicators['last_close'],
+            indicators['sma20_last'],
+            indicators['sma50_last'],
+            indicators['rsi_last'],
+            indicators['macd_last'],
+            indicators['macd_signal_last'],
+            indicators['bb_upper_last'],
+            indicators['bb_lower_last'],
+            indicators['atr_last'],
+            # condition_explanations['SMA_20_above_SMA_50'],
+            # condition_explanations['RSI_below_70'],
+            # condition_explanations['MACD_above_signal'],
+            # condition_explanations['Close_above_BB_lower'],
+            # condition_explanations['RSI_above_70'],
+            # condition_explanations['MACD_below_signal'],
+            # "Yes" if high_volatility and signal == "Don't Buy" else "No",
+            # "Yes" if high_volatility and signal == "Sell" else "No",
+        ]
+        data_table = pd.DataFrame([values], columns=TABLE_COLUMNS, index=pd.Index([ticker], name="Ticker"))
+
+        plot_inputs = (period, date.today(), weekly, long_name, history)
+        return data_table, plot_inputs, messages
+
+    except Exception as e:
+        messages.append(('error', f"An error occurred for {ticker}: {e}"))
+        return None, None, messages
+
+
+def analyze_stocks_complex_with_scoring_consolidated(tickers, period="1y", weekly=False):
     """
     Performs complex stock analysis with a scoring system, weighted indicators, and
     market condition adaptation, iterating over multiple stock tickers and
     returning a consolidated table and plots. The plots are now created
-    using subplots within a single figure for each stock.
+    using subplots within a single figure for each stock; the returned plots map
+    each ticker to its render_plot inputs so figures are only built when needed.
+    With weekly=True indicators are computed on weekly instead of daily bars.
     """
-    all_data = pd.DataFrame()
+    rows = []
     plots = {}
 
-    for ticker in tickers:
-        try:
-            stock = yf.Ticker(ticker)
-            history = stock.history(period=period)
-
-            if history.empty:
-                st.warning(f"No historical data found for {ticker}.")
-                continue
-
-            info = stock.info
-            current_price = info.get('currentPrice')
-            long_name = info.get('longName', ticker)
-            sector = info.get('sector')
-            pe_ratio = info.get('trailingPE')
-            dividend_yield = info.get('dividendYield')
-            history['SMA_20'] = sma_indicator(close=history['Close'], window=20)
-            history['SMA_50'] = sma_indicator(close=history['Close'], window=50)
-            history['RSI'] = rsi(close=history['Close'], window=14)
-            history['MACD'] = macd(close=history['Close'])
-            history['MACD_signal'] = macd_signal(close=history['Close'])
-            history['BB_upper'] = bollinger_hband(close=history['Close'])
-            history['BB_lower'] = bollinger_lband(close=history['Close'])
-            history['ATR'] = average_true_range(
-                high=history['High'], low=history['Low'], close=history['Close'])
-
-            atr_threshold = history['ATR'].mean() * 1.5
-            high_volatility = history['ATR'].iloc[-1] > atr_threshold
-
-            weights = {
-                'SMA_20_above_SMA_50': 0.3,
-                'RSI_below_70': 0.25,
-                'MACD_above_signal': 0.3,
-                'Close_above_BB_lower': 0.15,
-                'RSI_above_70': -0.2,  # Sell Indicator
-                'MACD_below_signal': -0.2,  # Sell Indicator
-            }
-
-            if high_volatility:
-                weights['RSI_below_70'] *= 1.2
-                weights['Close_above_BB_lower'] *= 0.8
-                weights['RSI_above_70'] *= 1.2  # Increase weight in high volatility
-                weights['MACD_below_signal'] *= 1.2
-
-            score = 0
-            conditions = {
-                'SMA_20_above_SMA_50': history['SMA_20'].iloc[-1] > history['SMA_50'].iloc[-1],
-                'RSI_below_70': history['RSI'].iloc[-1] < 70,
-                'MACD_above_signal': history['MACD'].iloc[-1] > history['MACD_signal'].iloc[-1],
-                'Close_above_BB_lower': history['Close'].iloc[-1] > history['BB_lower'].iloc[-1],
-                'RSI_above_70': history['RSI'].iloc[-1] > 70,  # Sell condition
-                'MACD_below_signal': history['MACD'].iloc[-1] < history['MACD_signal'].iloc[-1],  # Sell Condition
-            }
-            condition_explanations = {
-                'SMA_20_above_SMA_50': "Met" if conditions['SMA_20_above_SMA_50'] else "Not Met",
-                'RSI_below_70': "Met" if conditions['RSI_below_70'] else "Not Met",
-                'MACD_above_signal': "Met" if conditions['MACD_above_signal'] else "Not Met",
-                'Close_above_BB_lower': "Met" if conditions['Close_above_BB_lower'] else "Not Met",
-                'RSI_above_70': "Met" if conditions['RSI_above_70'] else "Not Met",
-                'MACD_below_signal': "Met" if conditions['MACD_below_signal'] else "Not Met",
-            }
-
-            for condition, value in conditions.items():
-                if value:
-                    score += weights[condition]
-
-            buy_threshold = 0.7
-            sell_threshold = 0.3  # Add a sell threshold
-
-            if high_volatility:
-                buy_threshold *= 1.1
-                sell_threshold *= 0.9  # Reduce sell threshold in high volatility
-
-            if score >= buy_threshold:
-                signal = "Buy"
-            elif score <= sell_threshold:
-                signal = "Sell"
-            elif 0.6 <= score < buy_threshold:  # original was elif 0.6 <= score < buy_threshold:
-                signal = "Hold"
-            else:
-                signal = "Don't Buy"  # changed from original signal = "Don't Buy"
-
-            last_data = history.tail(1)
-            data_table = pd.DataFrame(
-                {
-                    'Company': long_name,
-                    'Sector': sector,
-                    'Score': f"{score:.2f}",  # Formatted to 2 decimal places
-                    'Trade Signal': signal,  # changed name
-                    'Current Price': f"{current_price:.2f}", # Formatted to 2 decimal places
-                    'PE Ratio': f"{pe_ratio:.2f}", # Formatted to 2 decimal places
-                    'Dividend Yield': f"{dividend_yield:.2f}", # Formatted to 2 decimal places
-                    'Close': f"{last_data['Close'].values[0]:.2f}",
-                    'SMA_20': f"{last_data['SMA_20'].values[0]:.2f}",
-                    'SMA_50': f"{last_data['SMA_50'].values[0]:.2f}",
-                    'RSI': f"{last_data['RSI'].values[0]:.2f}",
-                    'MACD': f"{last_data['MACD'].values[0]:.2f}",
-                    'MACD_signal': f"{last_data['MACD_signal'].values[0]:.2f}",
-                    'BB_upper': f"{last_data['BB_upper'].values[0]:.2f}",
-                    'BB_lower': f"{last_data['BB_lower'].values[0]:.2f}",
-                    'ATR': f"{last_data['ATR'].values[0]:.2f}",
-                    # 'SMA_20_above_SMA_50_Explanation': condition_explanations['SMA_20_above_SMA_50'],
-                    # 'RSI_below_70_Explanation': condition_explanations['RSI_below_70'],
-                    # 'MACD_above_signal_Explanation': condition_explanations['MACD_above_signal'],
-                    # 'Close_above_BB_lower_Explanation': condition_explanations['Close_above_BB_lower'],
-                    # 'RSI_above_70_Explanation': condition_explanations['RSI_above_70'],
-                    # 'MACD_below_signal_Explanation': condition_explanations['MACD_below_signal'],
-                    # "High Volatility Don't Buy": "Yes" if high_volatility and signal == "Don't Buy" else "No",
-                    # "High Volatility Sell": "Yes" if high_volatility and signal == "Sell" else "No",
-                },
-                index=[ticker],
-            )
-            data_table.index.name = "Ticker"
-            all_data = pd.concat([all_data, data_table])
-
-            fig, axes = plt.subplots(3, 1, figsize=(16, 12))
-
-            axes[0].plot(history['Close'], label='Close Price')
-            axes[0].plot(history['SMA_20'], label='20-day SMA')
-            axes[0].plot(history['SMA_50'], label='50-day SMA')
-            axes[0].plot(history['BB_upper'], label='Bollinger Upper Band')
-            axes[0].plot(history['BB_lower'], label='Bollinger Lower Band')
-            axes[0].set_title(
-                f"{info.get('longName', ticker)} ({ticker}): Price, Moving Averages, and Bollinger Bands\n"
-                f"Bollinger Bands: Measure volatility. Prices near upper band may be overbought, near lower band may be oversold."
-            )
-            axes[0].set_ylabel('Price')
-            axes[0].set_xlabel('Date')
-            axes[0].legend()
-
-            axes[1].plot(history['RSI'], label='RSI')
-            axes[1].set_title(
-                f"{info.get('longName', ticker)} ({ticker}): Relative Strength Index (RSI)\n"
-                f"RSI: Measures the speed and change of price movements. Values above 70 indicate overbought conditions, below 30 indicate oversold."
-            )
-            axes[1].axhline(70, color='red', linestyle='--', label='Overbought (70)')
-            axes[1].axhline(30, color='green', linestyle='--', label='Oversold (30)')
-            axes[1].set_ylabel('RSI')
-            axes[1].set_xlabel('Date')
-            axes[1].legend()
-
-            axes[2].plot(history['MACD'], label='MACD')
-            axes[2].plot(history['MACD_signal'], label='MACD Signal')
-            axes[2].set_title(
-                f"{info.get('longName', ticker)} ({ticker}): Moving Average Convergence Divergence (MACD)\n"
-                f"MACD: Shows changes in strength, direction, momentum, and duration of a trend. A bullish crossover occurs when MACD crosses above the signal line."
-            )
-            axes[2].set_ylabel('MACD')
-            axes[2].set_xlabel('Date')
-            axes[2].legend()
-
-            plt.tight_layout()
-            plots[ticker] = fig
+    tickers = list(dict.fromkeys(ticker for ticker in tickers if ticker))
+    # Info and history come from different Yahoo endpoints, so fetch the infos in the
+    # background while the history batches download
+    ctx = get_script_run_ctx(suppress_warning=True)
+    with ThreadPoolExecutor(max_workers=1, initializer=attach_script_run_ctx, initargs=(ctx,)) as executor:
+        infos_future = executor.submit(fetch_infos, tickers)
+        hist_by_ticker = download_histories(tickers, period=period)
+        info_by_ticker = infos_future.result()
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(16, len(tickers))), initializer=attach_script_run_ctx, initargs=(ctx,),
+    ) as executor:
+        results = list(executor.map(
+            lambda ticker: _analyze_one(
+                ticker, period, hist_by_ticker.get(ticker, pd.DataFrame()), info_by_ticker.get(ticker, {}), weekly),
+            tickers,
+        ))
+
+    for ticker, (data_table, plot_inputs, messages) in zip(tickers, results):
+        for level, message in messages:  # Streamlit calls must happen on the script thread
+            getattr(st, level)(message)
+        if data_table is not None:
+            rows.append(data_table)
+            plots[ticker] = plot_inputs
+
+    all_data = pd.concat(rows) if rows else pd.DataFrame()  # One concat instead of one per ticker
+    if not all_data.empty:
+        # Numbers are rounded to 2 decimal places (missing info values become NaN) and the
+        # signal is stored as a categorical, instead of one Python string per cell. The numbers
+        # stay float64: float32 can't hold the cents of prices above ~$130k.
+        all_data = all_data.astype({column: np.float64 for column in NUMERIC_COLUMNS}).round(2)
+        all_data['Trade Signal'] = pd.Categorical(all_data['Trade Signal'], categories=TRADE_SIGNALS)
+        if weekly:  # Name the moving averages after the weekly windows, as the charts do
+            all_data = all_data.rename(columns={
+                'SMA_20': f"SMA_{WEEKLY_WINDOWS['sma_short']}",
+                'SMA_50': f"SMA_{WEEKLY_WINDOWS['sma_long']}",
+            })
+    return all_data, plots
 
-        except Exception as e:
-            st.error(f"An error occurred for {ticker}: {e}")
 
-    return all_data, plots
+@st.cache_data
+def to_csv_bytes(all_data):
+    """
+    Encodes the consolidated table as UTF-8 CSV. Cached so reruns that redraw the
+    download button don't serialize the table again.
+    """
+    return all_data.to_csv(float_format='%.2f').encode('utf-8')
 
 
 def main():
@@ -203,6 +666,7 @@ def main():
     ).upper()
 
     period = st.selectbox("Select period:", ["1y", "6mo", "3mo", "1mo"])
+    weekly = st.checkbox("Weekly bars", value=False)
     export_option = st.selectbox("Export Results:", ["None", "CSV", "All (CSV and Plots)"])
 
     if st.button("Analyze Stocks"):
@@ -212,20 +676,24 @@ def main():
 
         tickers = [symbol.strip() for symbol in stock_symbols.split(",")]
         all_data, plots = analyze_stocks_complex_with_scoring_consolidated(
-            tickers, period=period
+            tickers, period=period, weekly=weekly
         )
 
         st.session_state['all_data'] = all_data  # Store in session state
         st.session_state['plots'] = plots  # Store in session state
 
+    if 'all_data' in st.session_state and not st.session_state['all_data'].empty:  # Check if data exists
+        # Drawn from session state so the table stays on screen when other widgets rerun the script
+        all_data = st.session_state['all_data']
         st.header("Consolidated Analysis:")
-        if not all_data.empty:
-            st.dataframe(all_data)
+        st.dataframe(all_data, column_config={
+            column: st.column_config.NumberColumn(format="%.2f")
+            for column in all_data.select_dtypes('number').columns
+        })
 
-    if 'all_data' in st.session_state and not st.session_state['all_data'].empty:  # Check if data exists
         if export_option != "None":
             if export_option in ["CSV", "All (CSV and Plots)"]:
-                csv_file = st.session_state['all_data'].to_csv().encode('utf-8')
+                csv_file = to_csv_bytes(all_data)
                 st.download_button(
                     label="Download Consolidated Data (CSV)",
                     data=csv_file,
@@ -234,23 +702,20 @@ def main():
                 )
 
             if export_option == "All (CSV and Plots)":
-                for ticker, plot in st.session_state['plots'].items():
-                    buf = io.BytesIO()
-                    plot.savefig(buf, format='png')
-                    buf.seek(0)
+                for ticker, plot_inputs in st.session_state['plots'].items():
                     st.download_button(
                         label=f"Download {ticker} Analysis Plot (PNG)",
-                        data=buf,
+                        data=render_plot(ticker, *plot_inputs),
                         file_name=f"{ticker}_analysis_plot.png",
                         mime="image/png",
                     )
-                    plt.close(plot)
 
-        # Display Plots
+        # Display Plots. Only the selected tickers are charted, and matplotlib is only used for PNG export.
         st.header("Individual Stock Plots:")
-        for ticker, plot in st.session_state['plots'].items():
-            st.pyplot(plot)
-            plt.close(plot)
+        plot_tickers = st.multiselect("Show plots for:", list(st.session_state['plots']))
+        for ticker in plot_tickers:
+            _, _, weekly, long_name, history = st.session_state['plots'][ticker]
+            show_charts(ticker, weekly, long_name, history)
 
     elif stock_symbols and st.button("Analyze Stocks") == False:
         st.warning(